@@ -17,9 +17,11 @@
 import io
 import pathlib
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Union
 
 import numpy as np
+from packaging import version
 from PIL import Image
 
 from ...feature_extraction_utils import BatchFeature, FeatureExtractionMixin
@@ -32,6 +34,9 @@ if is_torch_available():
     import torch
     from torch import nn
 
+    # without antialiasing, bilinear downscaling with PyTorch doesn't match PIL
+    _is_antialias_available = version.parse(torch.__version__) >= version.parse("1.11")
+
 logger = logging.get_logger(__name__)
 
 
@@ -120,6 +125,10 @@ def id_to_rgb(id_map):
     return color
 
 
+# is_thing_map of COCO panoptic, mapping class indices to whether or not they are a thing
+COCO_PANOPTIC_IS_THING_MAP = {i: i <= 90 for i in range(201)}
+
+
 class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
     r"""
     Constructs a DETR feature extractor.
@@ -216,7 +225,7 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
         """
         Convert the target in COCO format into the format expected by DETR.
         """
-        w, h = image.size
+        w, h = image.size if isinstance(image, Image.Image) else (image.shape[-1], image.shape[-2])
 
         image_id = target["image_id"]
         image_id = np.asarray([image_id], dtype=np.int64)
@@ -277,7 +286,7 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
         return image, target
 
     def prepare_coco_panoptic(self, image, target, masks_path, return_masks=True):
-        w, h = image.size
+        w, h = image.size if isinstance(image, Image.Image) else (image.shape[-1], image.shape[-2])
         ann_info = target.copy()
         ann_path = pathlib.Path(masks_path) / ann_info["file_name"]
 
@@ -316,8 +325,6 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
 
         If given, also resize the target accordingly.
         """
-        if not isinstance(image, Image.Image):
-            image = self.to_pil_image(image)
 
         def get_size_with_aspect_ratio(image_size, size, max_size=None):
             w, h = image_size
@@ -347,13 +354,38 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
                 # so we revert the tuple
                 return get_size_with_aspect_ratio(image_size, size, max_size)[::-1]
 
-        size = get_size(image.size, size, max_size)
-        rescaled_image = self.resize(image, size=size)
+        resize_with_torch = self._is_channels_first_float(image)
+        if resize_with_torch:
+            image_size = (image.shape[2], image.shape[1])
+            size = get_size(image_size, size, max_size)
+            w, h = size
+            if not _is_antialias_available and (w < image_size[0] or h < image_size[1]):
+                resize_with_torch = False
+
+        if resize_with_torch:
+            # floating point arrays/tensors are resized with PyTorch directly, without converting them to uint8
+            interpolate_kwargs = {"antialias": True} if _is_antialias_available else {}
+            rescaled_image = nn.functional.interpolate(
+                torch.as_tensor(image)[None], size=(h, w), mode="bilinear", align_corners=False, **interpolate_kwargs
+            )[0]
+            # tensors on a GPU (or any other non-CPU device) stay there, everything else goes back to NumPy
+            if rescaled_image.device.type == "cpu":
+                rescaled_image = rescaled_image.numpy()
+            rescaled_size = size
+        else:
+            if is_torch_tensor(image) and image.device.type != "cpu":
+                image = image.cpu()
+            if not isinstance(image, Image.Image):
+                image = self.to_pil_image(image)
+            image_size = image.size
+            size = get_size(image_size, size, max_size)
+            rescaled_image = self.resize(image, size=size)
+            rescaled_size = rescaled_image.size
 
         if target is None:
             return rescaled_image, None
 
-        ratios = tuple(float(s) / float(s_orig) for s, s_orig in zip(rescaled_image.size, image.size))
+        ratios = tuple(float(s) / float(s_orig) for s, s_orig in zip(rescaled_size, image_size))
         ratio_width, ratio_height = ratios
 
         target = target.copy()
@@ -373,33 +405,106 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
         if "masks" in target:
             # use PyTorch as current workaround
             # TODO replace by self.resize
-            masks = torch.from_numpy(target["masks"][:, None]).float()
+            masks = target["masks"]
+            if masks.dtype == bool:
+                # nearest interpolation isn't implemented for booleans, but is for their uint8 view
+                masks = masks.view(np.uint8)
+            # the masks are interpolated in a single call, as a batch of single-channel images (unlike a single image
+            # with one channel per mask, this also works for images without any mask)
+            masks = torch.from_numpy(masks[:, None])
+            if masks.dtype != torch.uint8:
+                masks = masks.float()
             interpolated_masks = nn.functional.interpolate(masks, size=(h, w), mode="nearest")[:, 0] > 0.5
             target["masks"] = interpolated_masks.numpy()
 
         return rescaled_image, target
 
-    def _normalize(self, image, mean, std, target=None):
+    def _is_channels_first_float(self, image):
+        """
+        Whether `image` is a floating point NumPy array or PyTorch tensor of shape (C, H, W) that can be resized with
+        PyTorch without going through PIL.
         """
-        Normalize the image with a certain mean and std.
+        if not is_torch_available():
+            return False
+        if isinstance(image, np.ndarray):
+            is_float = np.issubdtype(image.dtype, np.floating)
+        elif is_torch_tensor(image):
+            is_float = image.is_floating_point()
+        else:
+            return False
+        return is_float and image.ndim == 3 and image.shape[0] in [1, 3]
 
-        If given, also normalize the target bounding boxes based on the size of the image.
+    def _normalize(self, images, mean, std, targets=None):
         """
+        Normalize a list of images with a certain mean and std. Images sharing the same shape are stacked and
+        normalized at once.
 
-        image = self.normalize(image, mean=mean, std=std)
-        if target is None:
-            return image, None
+        If given, also normalize the target bounding boxes based on the size of the images.
+        """
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+
+        # group the images by shape, so that each group is normalized with a single broadcasted operation
+        arrays = []
+        indices_per_group = defaultdict(list)
+        for idx, image in enumerate(images):
+            rescale = False
+            device = None
+            if isinstance(image, Image.Image):
+                image = np.asarray(image)
+                rescale = np.issubdtype(image.dtype, np.integer)
+                if image.ndim == 3:
+                    image = image.transpose(2, 0, 1)
+            elif is_torch_tensor(image) and image.device.type != "cpu":
+                # tensors on a GPU (or any other non-CPU device) are normalized there
+                device = image.device
+            arrays.append(image)
+            indices_per_group[(tuple(image.shape), rescale, device)].append(idx)
+
+        normalized_images = [None] * len(images)
+        for (shape, rescale, device), indices in indices_per_group.items():
+            # PIL images still have to be rescaled from [0, 255] to [0, 1], which is folded into the mean and std:
+            # (x / 255 - mean) / std = (x - 255 * mean) / (255 * std)
+            batch_mean, batch_std = (mean * 255, std * 255) if rescale else (mean, std)
+            if len(shape) == 3 and shape[0] in [1, 3]:
+                batch_mean, batch_std = batch_mean[:, None, None], batch_std[:, None, None]
+            # the batch can be normalized in-place, unless broadcasting with the mean and std expands it
+            in_place = np.broadcast(np.broadcast_to(0, shape), batch_mean).shape == shape
+
+            # stacking already copies the images, so the batch can safely be modified
+            if device is not None:
+                batch = torch.stack([arrays[idx] for idx in indices]).float()
+                batch_mean = torch.from_numpy(batch_mean).to(device)
+                batch_std = torch.from_numpy(batch_std).to(device)
+            else:
+                batch = np.stack([arrays[idx] for idx in indices]).astype(np.float32, copy=False)
 
-        target = target.copy()
-        h, w = image.shape[-2:]
+            if in_place:
+                batch -= batch_mean
+                batch /= batch_std
+            else:
+                # e.g. single-channel images normalized with a mean and std per channel
+                batch = (batch - batch_mean) / batch_std
+            for idx, image in zip(indices, batch):
+                normalized_images[idx] = image
 
-        if "boxes" in target:
-            boxes = target["boxes"]
-            boxes = corners_to_center_format(boxes)
-            boxes = boxes / np.asarray([w, h, w, h], dtype=np.float32)
-            target["boxes"] = boxes
+        if targets is None:
+            return normalized_images, None
 
-        return image, target
+        normalized_targets = []
+        for image, target in zip(normalized_images, targets):
+            target = target.copy()
+            h, w = image.shape[-2:]
+
+            if "boxes" in target:
+                boxes = target["boxes"]
+                boxes = corners_to_center_format(boxes)
+                boxes = boxes / np.asarray([w, h, w, h], dtype=np.float32)
+                target["boxes"] = boxes
+
+            normalized_targets.append(target)
+
+        return normalized_images, normalized_targets
 
     def __call__(
         self,
@@ -418,8 +523,10 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
 
         <Tip warning={true}>
 
-        NumPy arrays and PyTorch tensors are converted to PIL images when resizing, so the most efficient is to pass
-        PIL images.
+        Floating point NumPy arrays and PyTorch tensors of shape (C, H, W) are resized with PyTorch directly (with or
+        without annotations), and such floating point tensors on a GPU are kept on their device. With PyTorch < 1.11,
+        which can't antialias, they are still converted to PIL images when downscaled. Other NumPy arrays and PyTorch
+        tensors are converted to PIL images when resizing, which copies tensors on a GPU back to the CPU.
 
         </Tip>
 
@@ -451,10 +558,10 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
             pad_and_return_pixel_mask (`bool`, *optional*, defaults to `True`):
                 Whether or not to pad images up to the largest image in a batch and create a pixel mask.
 
-                If left to the default, will return a pixel mask that is:
+                If left to the default, will return a boolean pixel mask that is:
 
-                - 1 for pixels that are real (i.e. **not masked**),
-                - 0 for pixels that are padding (i.e. **masked**).
+                - `True` for pixels that are real (i.e. **not masked**),
+                - `False` for pixels that are padding (i.e. **masked**).
 
             return_tensors (`str` or [`~file_utils.TensorType`], *optional*):
                 If set, will return tensors instead of NumPy arrays. If set to `'pt'`, return PyTorch `torch.Tensor`
@@ -464,7 +571,7 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
             [`BatchFeature`]: A [`BatchFeature`] with the following fields:
 
             - **pixel_values** -- Pixel values to be fed to a model.
-            - **pixel_mask** -- Pixel mask to be fed to a model (when `pad_and_return_pixel_mask=True` or if
+            - **pixel_mask** -- Boolean pixel mask to be fed to a model (when `pad_and_return_pixel_mask=True` or if
               *"pixel_mask"* is in `self.model_input_names`).
             - **labels** -- Optional labels to be fed to a model (when `annotations` are provided)
         """
@@ -550,7 +657,11 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
         # prepare (COCO annotations as a list of Dict -> DETR target as a single Dict per image)
         if annotations is not None:
             for idx, (image, target) in enumerate(zip(images, annotations)):
-                if not isinstance(image, Image.Image):
+                # floating point arrays/tensors of shape (C, H, W) are kept as is (and on their device), as they are
+                # resized with PyTorch directly
+                if not isinstance(image, Image.Image) and not self._is_channels_first_float(image):
+                    if is_torch_tensor(image) and image.device.type != "cpu":
+                        image = image.cpu()
                     image = self.to_pil_image(image)
                 image, target = self.prepare(image, target, return_segmentation_masks, masks_path)
                 images[idx] = image
@@ -558,44 +669,39 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
 
         # transformations (resizing + normalization)
         if self.do_resize and self.size is not None:
-            if annotations is not None:
-                for idx, (image, target) in enumerate(zip(images, annotations)):
-                    image, target = self._resize(image=image, target=target, size=self.size, max_size=self.max_size)
-                    images[idx] = image
-                    annotations[idx] = target
+
+            def resize(image, target):
+                return self._resize(image=image, target=target, size=self.size, max_size=self.max_size)
+
+            targets = annotations if annotations is not None else [None] * len(images)
+            if len(images) > 1:
+                # PIL (and PyTorch) release the GIL while resizing, so the images of a batch can be resized in parallel
+                with ThreadPoolExecutor(max_workers=min(8, len(images))) as executor:
+                    resized = list(executor.map(resize, images, targets))
             else:
-                for idx, image in enumerate(images):
-                    images[idx] = self._resize(image=image, target=None, size=self.size, max_size=self.max_size)[0]
+                resized = list(map(resize, images, targets))
 
-        if self.do_normalize:
+            images = [image for image, _ in resized]
             if annotations is not None:
-                for idx, (image, target) in enumerate(zip(images, annotations)):
-                    image, target = self._normalize(
-                        image=image, mean=self.image_mean, std=self.image_std, target=target
-                    )
-                    images[idx] = image
-                    annotations[idx] = target
-            else:
-                images = [
-                    self._normalize(image=image, mean=self.image_mean, std=self.image_std)[0] for image in images
-                ]
+                annotations = [target for _, target in resized]
+
+        if self.do_normalize:
+            images, annotations = self._normalize(
+                images=images, mean=self.image_mean, std=self.image_std, targets=annotations
+            )
 
         if pad_and_return_pixel_mask:
             # pad images up to largest image in batch and create pixel_mask
-            max_size = self._max_by_axis([list(image.shape) for image in images])
-            c, h, w = max_size
-            padded_images = []
-            pixel_mask = []
-            for image in images:
-                # create padded image
-                padded_image = np.zeros((c, h, w), dtype=np.float32)
-                padded_image[: image.shape[0], : image.shape[1], : image.shape[2]] = np.copy(image)
-                padded_images.append(padded_image)
-                # create pixel mask
-                mask = np.zeros((h, w), dtype=np.int64)
-                mask[: image.shape[1], : image.shape[2]] = True
-                pixel_mask.append(mask)
-            images = padded_images
+            images, pixel_mask = self._pad_images(images, return_tensors=return_tensors)
+        elif (
+            return_tensors is not None
+            and TensorType(return_tensors) == TensorType.PYTORCH
+            and is_torch_available()
+            and all(isinstance(image, np.ndarray) or is_torch_tensor(image) for image in images)
+            and len({tuple(image.shape) for image in images}) == 1
+        ):
+            # `torch.as_tensor` shares the memory of NumPy arrays, so the images are only copied once when stacked
+            images = torch.stack([torch.as_tensor(image) for image in images])
 
         # return as BatchFeature
         data = {}
@@ -624,11 +730,32 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
 
     def _max_by_axis(self, the_list):
         # type: (List[List[int]]) -> List[int]
-        maxes = the_list[0]
-        for sublist in the_list[1:]:
-            for index, item in enumerate(sublist):
-                maxes[index] = max(maxes[index], item)
-        return maxes
+        return list(map(max, zip(*the_list)))
+
+    def _pad_images(self, images, return_tensors=None):
+        """
+        Pad a list of images of shape (C, H, W) into a single zero-initialized batch of shape (N, C, H, W) and create
+        the corresponding boolean pixel mask of shape (N, H, W). The batch is directly created as PyTorch tensors if
+        `return_tensors` is set to `'pt'`, and as NumPy arrays otherwise.
+        """
+        c, h, w = self._max_by_axis([list(image.shape) for image in images])
+        device = images[0].device if is_torch_tensor(images[0]) else None
+        if return_tensors is not None and TensorType(return_tensors) == TensorType.PYTORCH:
+            if not is_torch_available():
+                raise ImportError("Unable to convert output to PyTorch tensors format, PyTorch is not installed.")
+            padded_images = torch.zeros((len(images), c, h, w), dtype=torch.float32, device=device)
+            pixel_mask = torch.zeros((len(images), h, w), dtype=torch.bool, device=device)
+            images = [torch.as_tensor(image) for image in images]
+        else:
+            # NumPy arrays are requested, so tensors on a GPU are copied back to the CPU
+            if device is not None:
+                images = [image.cpu() if is_torch_tensor(image) else image for image in images]
+            padded_images = np.zeros((len(images), c, h, w), dtype=np.float32)
+            pixel_mask = np.zeros((len(images), h, w), dtype=np.bool_)
+        for idx, image in enumerate(images):
+            padded_images[idx, : image.shape[0], : image.shape[1], : image.shape[2]] = image
+            pixel_mask[idx, : image.shape[1], : image.shape[2]] = True
+        return padded_images, pixel_mask
 
     def pad_and_create_pixel_mask(
         self, pixel_values_list: List["torch.Tensor"], return_tensors: Optional[Union[str, TensorType]] = None
@@ -647,24 +774,12 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
             [`BatchFeature`]: A [`BatchFeature`] with the following fields:
 
             - **pixel_values** -- Pixel values to be fed to a model.
-            - **pixel_mask** -- Pixel mask to be fed to a model (when `pad_and_return_pixel_mask=True` or if
+            - **pixel_mask** -- Boolean pixel mask to be fed to a model (when `pad_and_return_pixel_mask=True` or if
               *"pixel_mask"* is in `self.model_input_names`).
 
         """
 
-        max_size = self._max_by_axis([list(image.shape) for image in pixel_values_list])
-        c, h, w = max_size
-        padded_images = []
-        pixel_mask = []
-        for image in pixel_values_list:
-            # create padded image
-            padded_image = np.zeros((c, h, w), dtype=np.float32)
-            padded_image[: image.shape[0], : image.shape[1], : image.shape[2]] = np.copy(image)
-            padded_images.append(padded_image)
-            # create pixel mask
-            mask = np.zeros((h, w), dtype=np.int64)
-            mask[: image.shape[1], : image.shape[2]] = True
-            pixel_mask.append(mask)
+        padded_images, pixel_mask = self._pad_images(pixel_values_list, return_tensors=return_tensors)
 
         # return as BatchFeature
         data = {"pixel_values": padded_images, "pixel_mask": pixel_mask}
@@ -738,16 +853,20 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
                 return tup
             return tuple(tup.cpu().tolist())
 
-        for cur_logits, cur_masks, size in zip(out_logits, raw_masks, target_sizes):
-            # we filter empty queries and detection below threshold
-            scores, labels = cur_logits.softmax(-1).max(-1)
-            keep = labels.ne(outputs.logits.shape[-1] - 1) & (scores > threshold)
-            cur_scores, cur_classes = cur_logits.softmax(-1).max(-1)
-            cur_scores = cur_scores[keep]
-            cur_classes = cur_classes[keep]
-            cur_masks = cur_masks[keep]
+        # sigmoid(x) > mask_threshold is equivalent to x > logit(mask_threshold)
+        with np.errstate(divide="ignore"):
+            mask_logits_threshold = float(np.log(mask_threshold) - np.log1p(-mask_threshold))
+
+        # we filter empty queries and detection below threshold, for the whole batch at once
+        scores, labels = out_logits.softmax(-1).max(-1)
+        keep = labels.ne(out_logits.shape[-1] - 1) & (scores > threshold)
+
+        for cur_scores, cur_classes, cur_keep, cur_masks, size in zip(scores, labels, keep, raw_masks, target_sizes):
+            cur_scores = cur_scores[cur_keep]
+            cur_classes = cur_classes[cur_keep]
+            cur_masks = cur_masks[cur_keep]
             cur_masks = nn.functional.interpolate(cur_masks[:, None], to_tuple(size), mode="bilinear").squeeze(1)
-            cur_masks = (cur_masks.sigmoid() > mask_threshold) * 1
+            cur_masks = (cur_masks > mask_logits_threshold) * 1
 
             predictions = {"scores": cur_scores, "labels": cur_classes, "masks": cur_masks}
             preds.append(predictions)
@@ -828,13 +947,15 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
 
         if is_thing_map is None:
             # default to is_thing_map of COCO panoptic
-            is_thing_map = {i: i <= 90 for i in range(201)}
+            is_thing_map = COCO_PANOPTIC_IS_THING_MAP
 
         out_logits, raw_masks, raw_boxes = outputs.logits, outputs.pred_masks, outputs.pred_boxes
         if not len(out_logits) == len(raw_masks) == len(target_sizes):
             raise ValueError(
                 "Make sure that you pass in as many target sizes as the batch dimension of the logits and masks"
             )
+        if raw_boxes.shape[:2] != out_logits.shape[:2]:
+            raise ValueError("Not as many boxes as there are classes")
         preds = []
 
         def to_tuple(tup):
@@ -842,36 +963,37 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
                 return tup
             return tuple(tup.cpu().tolist())
 
-        for cur_logits, cur_masks, cur_boxes, size, target_size in zip(
-            out_logits, raw_masks, raw_boxes, processed_sizes, target_sizes
+        # we filter empty queries and detection below threshold, for the whole batch at once. The highest probability
+        # of each query is exp(max_logit - logsumexp(logits))
+        max_logits, labels = out_logits.max(-1)
+        scores = (max_logits - out_logits.logsumexp(-1)).exp()
+        keep = labels.ne(out_logits.shape[-1] - 1) & (scores > threshold)
+
+        for cur_scores, cur_classes, cur_keep, cur_masks, size, target_size in zip(
+            scores, labels, keep, raw_masks, processed_sizes, target_sizes
         ):
-            # we filter empty queries and detection below threshold
-            scores, labels = cur_logits.softmax(-1).max(-1)
-            keep = labels.ne(outputs.logits.shape[-1] - 1) & (scores > threshold)
-            cur_scores, cur_classes = cur_logits.softmax(-1).max(-1)
-            cur_scores = cur_scores[keep]
-            cur_classes = cur_classes[keep]
-            cur_masks = cur_masks[keep]
+            cur_scores = cur_scores[cur_keep]
+            cur_classes = cur_classes[cur_keep]
+            cur_masks = cur_masks[cur_keep]
             cur_masks = nn.functional.interpolate(cur_masks[:, None], to_tuple(size), mode="bilinear").squeeze(1)
-            cur_boxes = center_to_corners_format(cur_boxes[keep])
 
             h, w = cur_masks.shape[-2:]
-            if len(cur_boxes) != len(cur_classes):
-                raise ValueError("Not as many boxes as there are classes")
 
             # It may be that we have several predicted masks for the same stuff class.
             # In the following, we track the list of masks ids for each stuff class (they are merged later on)
             cur_masks = cur_masks.flatten(1)
             stuff_equiv_classes = defaultdict(lambda: [])
-            for k, label in enumerate(cur_classes):
-                if not is_thing_map[label.item()]:
-                    stuff_equiv_classes[label.item()].append(k)
+            # labels as host ints for the is_thing_map lookups
+            for k, label in enumerate(cur_classes.tolist()):
+                if not is_thing_map[label]:
+                    stuff_equiv_classes[label].append(k)
 
             def get_ids_area(masks, scores, dedup=False):
                 # This helper function creates the final panoptic segmentation image
                 # It also returns the area of the masks that appears on the image
 
-                m_id = masks.transpose(0, 1).softmax(-1)
+                # the softmax over the masks is monotonic, so it can be skipped when only taking their argmax
+                m_id = masks.transpose(0, 1)
 
                 if m_id.shape[-1] == 0:
                     # We didn't detect any mask :(
@@ -897,22 +1019,22 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
 
                 m_id = torch.from_numpy(rgb_to_id(np_seg_img))
 
-                area = []
-                for i in range(len(scores)):
-                    area.append(m_id.eq(i).sum().item())
+                # number of pixels of each mask
+                area = torch.bincount(m_id.flatten(), minlength=len(scores))[: len(scores)].tolist()
                 return area, seg_img
 
             area, seg_img = get_ids_area(cur_masks, cur_scores, dedup=True)
             if cur_classes.numel() > 0:
                 # We know filter empty masks as long as we find some
                 while True:
-                    filtered_small = torch.as_tensor(
-                        [area[i] <= 4 for i, c in enumerate(cur_classes)], dtype=torch.bool, device=keep.device
-                    )
-                    if filtered_small.any().item():
-                        cur_scores = cur_scores[~filtered_small]
-                        cur_classes = cur_classes[~filtered_small]
-                        cur_masks = cur_masks[~filtered_small]
+                    filtered_small = [a <= 4 for a in area]
+                    if any(filtered_small):
+                        not_small = torch.as_tensor(
+                            [not f for f in filtered_small], dtype=torch.bool, device=cur_keep.device
+                        )
+                        cur_scores = cur_scores[not_small]
+                        cur_classes = cur_classes[not_small]
+                        cur_masks = cur_masks[not_small]
                         area, seg_img = get_ids_area(cur_masks, cur_scores)
                     else:
                         break
@@ -920,10 +1042,10 @@ class DetrFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
             else:
                 cur_classes = torch.ones(1, dtype=torch.long, device=cur_classes.device)
 
-            segments_info = []
-            for i, a in enumerate(area):
-                cat = cur_classes[i].item()
-                segments_info.append({"id": i, "isthing": is_thing_map[cat], "category_id": cat, "area": a})
+            segments_info = [
+                {"id": i, "isthing": is_thing_map[cat], "category_id": cat, "area": a}
+                for i, (cat, a) in enumerate(zip(cur_classes.tolist(), area))
+            ]
             del cur_classes
 
             with io.BytesIO() as out:
@@ -840,11 +840,12 @@ DETR_INPUTS_DOCSTRING = r"""
             Pixel values can be obtained using [`DetrFeatureExtractor`]. See [`DetrFeatureExtractor.__call__`] for
             details.
 
-        pixel_mask (`torch.LongTensor` of shape `(batch_size, height, width)`, *optional*):
-            Mask to avoid performing attention on padding pixel values. Mask values selected in `[0, 1]`:
+        pixel_mask (`torch.BoolTensor` or `torch.LongTensor` of shape `(batch_size, height, width)`, *optional*):
+            Mask to avoid performing attention on padding pixel values. Mask values selected in `[False, True]` or
+            `[0, 1]`:
 
-            - 1 for pixels that are real (i.e. **not masked**),
-            - 0 for pixels that are padding (i.e. **masked**).
+            - True or 1 for pixels that are real (i.e. **not masked**),
+            - False or 0 for pixels that are padding (i.e. **masked**).
 
             [What are attention masks?](../glossary#attention-mask)
 
@@ -2219,11 +2220,7 @@ def generalized_box_iou(boxes1, boxes2):
 
 def _max_by_axis(the_list):
     # type: (List[List[int]]) -> List[int]
-    maxes = the_list[0]
-    for sublist in the_list[1:]:
-        for index, item in enumerate(sublist):
-            maxes[index] = max(maxes[index], item)
-    return maxes
+    return list(map(max, zip(*the_list)))
 
 
 class NestedTensor(object):
@@ -165,7 +165,7 @@ class ViltFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
         for image in pixel_values_list:
             # create padded image
             padded_image = np.zeros((c, h, w), dtype=np.float32)
-            padded_image[: image.shape[0], : image.shape[1], : image.shape[2]] = np.copy(image)
+            padded_image[: image.shape[0], : image.shape[1], : image.shape[2]] = image
             padded_images.append(padded_image)
             # create pixel mask
             mask = np.zeros((h, w), dtype=np.int64)
@@ -274,7 +274,7 @@ class ViltFeatureExtractor(FeatureExtractionMixin, ImageFeatureExtractionMixin):
             for image in images:
                 # create padded image
                 padded_image = np.zeros((c, h, w), dtype=np.float32)
-                padded_image[: image.shape[0], : image.shape[1], : image.shape[2]] = np.copy(image)
+                padded_image[: image.shape[0], : image.shape[1], : image.shape[2]] = image
                 padded_images.append(padded_image)
                 # create pixel mask
                 mask = np.zeros((h, w), dtype=np.int64)
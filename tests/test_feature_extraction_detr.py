@@ -14,6 +14,7 @@
 # limitations under the License.
 
 
+import io
 import json
 import pathlib
 import unittest
@@ -21,7 +22,7 @@ import unittest
 import numpy as np
 
 from transformers.file_utils import is_torch_available, is_vision_available
-from transformers.testing_utils import require_torch, require_vision, slow
+from transformers.testing_utils import require_torch, require_torch_gpu, require_vision, slow, torch_device
 
 from .test_feature_extraction_common import FeatureExtractionSavingTestMixin, prepare_image_inputs
 
@@ -29,6 +30,8 @@ from .test_feature_extraction_common import FeatureExtractionSavingTestMixin, pr
 if is_torch_available():
     import torch
 
+    from transformers.models.detr.modeling_detr import DetrSegmentationOutput
+
 if is_vision_available():
     from PIL import Image
 
@@ -227,6 +230,103 @@ class DetrFeatureExtractionTest(FeatureExtractionSavingTestMixin, unittest.TestC
             ),
         )
 
+    def test_call_float_inputs(self):
+        # Initialize feature_extractor
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        # create random floating point numpy arrays, which are resized without going through PIL
+        image_inputs = prepare_image_inputs(self.feature_extract_tester, equal_resolution=False, numpify=True)
+        image_inputs = [image.astype(np.float32) / 255.0 for image in image_inputs]
+
+        encoded_images = feature_extractor(image_inputs, return_tensors="pt").pixel_values
+
+        expected_height, expected_width = self.feature_extract_tester.get_expected_values(image_inputs, batched=True)
+
+        self.assertEqual(
+            encoded_images.shape,
+            (
+                self.feature_extract_tester.batch_size,
+                self.feature_extract_tester.num_channels,
+                expected_height,
+                expected_width,
+            ),
+        )
+
+        # PyTorch tensors should give the same result as NumPy arrays
+        encoded_images_torch = feature_extractor(
+            [torch.from_numpy(image) for image in image_inputs], return_tensors="pt"
+        ).pixel_values
+        self.assertTrue(torch.allclose(encoded_images, encoded_images_torch, atol=1e-4))
+
+    def test_call_float_inputs_with_annotations(self):
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        image = np.random.rand(3, 40, 60).astype(np.float32)
+        annotation = {"image_id": 0, "annotations": [{"bbox": [2, 3, 10, 12], "category_id": 1, "area": 120}]}
+
+        # annotations don't change how floating point inputs are resized
+        encoding = feature_extractor(image, annotations=annotation, return_tensors="pt")
+        expected_pixel_values = feature_extractor(image, return_tensors="pt").pixel_values
+        self.assertTrue(torch.allclose(encoding["pixel_values"], expected_pixel_values, atol=1e-6))
+        self.assertTrue(torch.allclose(encoding["labels"][0]["size"], torch.tensor([18, 27])))
+
+    @require_torch_gpu
+    def test_call_pytorch_on_gpu(self):
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        image_inputs = [np.random.rand(3, 40, 60).astype(np.float32), np.random.rand(3, 30, 20).astype(np.float32)]
+        annotation = {"image_id": 0, "annotations": [{"bbox": [2, 3, 10, 12], "category_id": 1, "area": 120}]}
+
+        expected_encoding = feature_extractor(image_inputs, annotations=[annotation] * 2, return_tensors="pt")
+        # floating point tensors are resized, normalized and padded on their device, also with annotations
+        encoding = feature_extractor(
+            [torch.from_numpy(image).to(torch_device) for image in image_inputs],
+            annotations=[annotation] * 2,
+            return_tensors="pt",
+        )
+
+        self.assertEqual(encoding["pixel_values"].device.type, torch_device)
+        self.assertEqual(encoding["pixel_mask"].device.type, torch_device)
+        self.assertTrue(torch.allclose(encoding["pixel_values"].cpu(), expected_encoding["pixel_values"], atol=1e-4))
+        self.assertTrue(torch.equal(encoding["pixel_mask"].cpu(), expected_encoding["pixel_mask"]))
+        for labels, expected_labels in zip(encoding["labels"], expected_encoding["labels"]):
+            self.assertTrue(torch.allclose(labels["boxes"], expected_labels["boxes"]))
+
+    def test_resize_float_matches_pil(self):
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        image = np.random.randint(0, 256, size=(3, 60, 90), dtype=np.uint8)
+        pil_image = Image.fromarray(image.transpose(1, 2, 0))
+
+        # both upscaling and downscaling, the latter needing antialiasing to match PIL
+        for size in [18, 40, 120]:
+            resized_pil_image, _ = feature_extractor._resize(pil_image, size=size)
+            expected = np.asarray(resized_pil_image).transpose(2, 0, 1) / 255.0
+            resized_image, _ = feature_extractor._resize(image.astype(np.float32) / 255.0, size=size)
+
+            self.assertEqual(resized_image.shape, expected.shape)
+            # PIL rounds its result to uint8
+            self.assertTrue(np.allclose(resized_image, expected, atol=1.01 / 255))
+
+    def test_resize_masks(self):
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        image = Image.fromarray(np.zeros((20, 30, 3), dtype=np.uint8))
+
+        masks = np.zeros((2, 20, 30), dtype=bool)
+        masks[0, :10, :15] = True
+        masks[1, 5:, 10:] = True
+        _, target = feature_extractor._resize(image, size=40, target={"masks": masks})
+
+        # nearest interpolation keeps the masks binary and scales their area exactly
+        self.assertEqual(target["masks"].shape, (2, 40, 60))
+        self.assertEqual(target["masks"].dtype, bool)
+        self.assertEqual(target["masks"][0].sum(), 4 * masks[0].sum())
+        self.assertEqual(target["masks"][1].sum(), 4 * masks[1].sum())
+
+        # integer masks give the same result
+        _, int_target = feature_extractor._resize(image, size=40, target={"masks": masks.astype(np.int64)})
+        self.assertTrue(np.array_equal(int_target["masks"], target["masks"]))
+
+        # an image can have no masks at all
+        _, target = feature_extractor._resize(image, size=40, target={"masks": masks[:0]})
+        self.assertEqual(target["masks"].shape, (0, 40, 60))
+
     def test_equivalence_pad_and_create_pixel_mask(self):
         # Initialize feature_extractors
         feature_extractor_1 = self.feature_extraction_class(**self.feat_extract_dict)
@@ -243,6 +343,50 @@ class DetrFeatureExtractionTest(FeatureExtractionSavingTestMixin, unittest.TestC
         assert torch.allclose(encoded_images_with_method["pixel_values"], encoded_images["pixel_values"], atol=1e-4)
         assert torch.allclose(encoded_images_with_method["pixel_mask"], encoded_images["pixel_mask"], atol=1e-4)
 
+    def test_pad_and_create_pixel_mask_values(self):
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        image_inputs = [np.random.rand(3, 20, 30).astype(np.float32), np.random.rand(3, 25, 10).astype(np.float32)]
+
+        encoding = feature_extractor.pad_and_create_pixel_mask(image_inputs)
+
+        self.assertEqual(encoding["pixel_values"].shape, (2, 3, 25, 30))
+        self.assertEqual(encoding["pixel_mask"].shape, (2, 25, 30))
+        self.assertEqual(encoding["pixel_mask"].dtype, bool)
+        for image, padded_image, mask in zip(image_inputs, encoding["pixel_values"], encoding["pixel_mask"]):
+            _, h, w = image.shape
+            # the original pixels are copied over, everything else is zero-padding
+            self.assertTrue(np.array_equal(padded_image[:, :h, :w], image))
+            self.assertFalse(padded_image[:, h:, :].any())
+            self.assertFalse(padded_image[:, :, w:].any())
+            self.assertTrue(mask[:h, :w].all())
+            self.assertEqual(mask.sum(), h * w)
+
+    def test_post_process_panoptic(self):
+        feature_extractor = self.feature_extraction_class(**self.feat_extract_dict)
+        batch_size, num_queries, num_labels, height, width = 3, 10, 5, 24, 32
+        logits = torch.randn(batch_size, num_queries, num_labels + 1)
+        # make sure all queries are kept
+        logits[:, :, -1] = -1e4
+        outputs = DetrSegmentationOutput(
+            logits=logits,
+            pred_masks=torch.randn(batch_size, num_queries, height, width),
+            pred_boxes=torch.rand(batch_size, num_queries, 4),
+        )
+        processed_sizes = torch.tensor([[height, width]] * batch_size)
+        target_sizes = torch.tensor([[2 * height, 2 * width]] * batch_size)
+
+        preds = feature_extractor.post_process_panoptic(outputs, processed_sizes, target_sizes, threshold=0.0)
+
+        # one prediction per image
+        self.assertEqual(len(preds), batch_size)
+        for pred in preds:
+            segmentation = Image.open(io.BytesIO(pred["png_string"]))
+            self.assertEqual(segmentation.size, (2 * width, 2 * height))
+            segments_info = pred["segments_info"]
+            self.assertEqual([segment["id"] for segment in segments_info], list(range(len(segments_info))))
+            # every pixel belongs to exactly one segment
+            self.assertEqual(sum(segment["area"] for segment in segments_info), 4 * height * width)
+
     @slow
     def test_call_pytorch_with_coco_detection_annotations(self):
         # prepare image and target